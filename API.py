@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request, render_template_string
+from flask import Flask, jsonify, request, render_template_string, g
 from http import HTTPStatus
 import jwt
 from datetime import datetime, timedelta
@@ -6,26 +6,893 @@ from functools import wraps
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
 from flask_mysqldb import MySQL
+import MySQLdb
+import MySQLdb.cursors
 import os
+import math
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
 
 app = Flask(__name__)
-app.config['MYSQL_HOST'] = 'localhost'
-app.config['MYSQL_USER'] = 'root'
-app.config['MYSQL_PASSWORD'] = 'root'
-app.config['MYSQL_DB'] = 'minimized_inventory_control_for_sports_centers'
-app.config['SECRET_KEY'] = 'darwin'
+app.config['MYSQL_HOST'] = os.environ.get('MYSQL_HOST', 'localhost')
+app.config['MYSQL_USER'] = os.environ.get('MYSQL_USER', 'root')
+app.config['MYSQL_PASSWORD'] = os.environ.get('MYSQL_PASSWORD', 'root')
+app.config['MYSQL_DB'] = os.environ.get('MYSQL_DB', 'minimized_inventory_control_for_sports_centers')
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'darwin')
+app.config['GROUP_COMMIT'] = False
+app.config['GROUP_COMMIT_WINDOW_MS'] = 5
+app.config['GROUP_COMMIT_MAX_BATCH'] = 100
+app.config['GROUP_COMMIT_TIMEOUT_SECONDS'] = 10
+app.config['MYSQL_REPLICAS'] = []
+app.config['REPLICA_RETRY_SECONDS'] = 10
+app.config['REPLICA_CONNECT_TIMEOUT'] = 2
+app.config['REPLICA_HEALTH_CHECK_SECONDS'] = 5
+app.config['REPLICA_MAX_LAG_SECONDS'] = 5
+app.config['READ_YOUR_WRITES_SECONDS'] = 5
+# (tokens per second, burst) for each role; "list" covers GET endpoints, "write" the rest
+app.config['RATE_LIMITS'] = {
+    'admin': {'list': (5, 20), 'write': (50, 100)},
+    'user': {'list': (2, 10), 'write': (20, 40)},
+}
+app.config['SHARED_STATE_DB'] = os.path.join(tempfile.gettempdir(), 'inventory_shared_state.sqlite3')
+app.config['MAX_IN_FLIGHT'] = 64
+app.config['QUEUE_DEPTH'] = None
+app.config['OVERLOAD_RETRY_AFTER'] = 1
+app.config['SUMMARY_RECONCILE_SECONDS'] = 30
+app.config['STOCK_CACHE_SECONDS'] = 5
+app.config['STOCK_SNAPSHOT_SECONDS'] = 600
+app.config['STOCK_SNAPSHOT_LAG_SECONDS'] = 60
 mysql = MySQL(app)
 
-USER_DATA_FILE = 'users.json'
-
-if not os.path.exists(USER_DATA_FILE):
-    with open(USER_DATA_FILE, 'w') as f:
-        json.dump({}, f)
+USER_DATA_FILE = os.environ.get('USER_DATA_FILE', 'users.json')
+
+def env_flag(value):
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def env_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+# Settings that create_app() reads from environment variables of the same name
+ENV_SETTINGS = {
+    'GROUP_COMMIT': env_flag,
+    'GROUP_COMMIT_WINDOW_MS': float,
+    'GROUP_COMMIT_MAX_BATCH': int,
+    'GROUP_COMMIT_TIMEOUT_SECONDS': float,
+    'MYSQL_PORT': int,
+    'MYSQL_REPLICAS': env_list,
+    'REPLICA_RETRY_SECONDS': float,
+    'REPLICA_CONNECT_TIMEOUT': int,
+    'REPLICA_HEALTH_CHECK_SECONDS': float,
+    'REPLICA_MAX_LAG_SECONDS': float,
+    'READ_YOUR_WRITES_SECONDS': float,
+    'RATE_LIMITS': json.loads,
+    'SHARED_STATE_DB': str,
+    'MAX_IN_FLIGHT': int,
+    'OVERLOAD_RETRY_AFTER': int,
+    'SUMMARY_RECONCILE_SECONDS': float,
+    'STOCK_CACHE_SECONDS': float,
+    'STOCK_SNAPSHOT_SECONDS': float,
+    'STOCK_SNAPSHOT_LAG_SECONDS': int,
+}
+
+# App factory used by SERVER.py; nothing connects to MySQL until the first request needs it.
+# There is only one app per process: create_app() configures and returns the module-level
+# `app`, so a second call changes the settings seen by every existing user of it.
+def create_app(config=None):
+    for key, parse in ENV_SETTINGS.items():
+        if key in os.environ:
+            app.config[key] = parse(os.environ[key])
+    if config:
+        app.config.update(config)
+
+    for role, budgets in app.config['RATE_LIMITS'].items():
+        for budget, limits in budgets.items():
+            if not valid_rate_limit(limits):
+                raise ValueError(f"RATE_LIMITS[{role!r}][{budget!r}] must be a positive rate and a burst of at least 1")
+    return app
 
 # Error handling
 def handle_error(message, status_code):
     return jsonify({"success": False, "error": message}), status_code
 
+def handle_overload(message, status_code, retry_after):
+    response, status_code = handle_error(message, status_code)
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, status_code
+
+# Admission control: sheds load with 503 once too many requests are queued. Under
+# SERVER.py's gthread workers on gunicorn 23, QUEUE_DEPTH reports the requests the
+# worker has accepted, both running and waiting for a thread. Otherwise RequestCounter
+# counts the requests inside the app, from the WSGI call until the app returns its
+# response, which can never exceed the server's thread count.
+class RequestCounter:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self.lock:
+            self.count += 1
+        try:
+            return self.wsgi_app(environ, start_response)
+        finally:
+            with self.lock:
+                self.count -= 1
+
+    def depth(self):
+        return self.count
+
+request_counter = RequestCounter(app.wsgi_app)
+app.wsgi_app = request_counter
+
+@app.before_request
+def admit_request():
+    queue_depth = app.config['QUEUE_DEPTH'] or request_counter.depth
+    if queue_depth() > app.config['MAX_IN_FLIGHT']:
+        return handle_overload('Server is overloaded, try again later', HTTPStatus.SERVICE_UNAVAILABLE,
+                               app.config['OVERLOAD_RETRY_AFTER'])
+
+# State shared by every worker process on the host, kept in the SHARED_STATE_DB SQLite
+# file. Each thread opens its own connection and creates the table it needs.
+class SharedState:
+    SCHEMA = None
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode NORMAL syncs at checkpoints instead of on every commit; a crash
+            # can only lose the last few bucket or pin updates
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(self.SCHEMA)
+            self.local.connection = connection
+        return connection
+
+# Rate limiting: one token bucket per user, role and budget, so every worker process on
+# the host takes from the same budget.
+class SharedTokenBuckets(SharedState):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)
+    """
+
+    # Returns 0 when a token was taken, otherwise the seconds until one is available
+    def take(self, key, rate, capacity):
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            bucket = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            tokens = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            retry_after = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            connection.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                               (key, tokens, now))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+rate_buckets = None
+rate_buckets_lock = threading.Lock()
+
+def get_rate_buckets():
+    global rate_buckets
+    if rate_buckets is None:
+        with rate_buckets_lock:
+            if rate_buckets is None:
+                rate_buckets = SharedTokenBuckets(app.config['SHARED_STATE_DB'])
+    return rate_buckets
+
+def valid_rate_limit(limits):
+    try:
+        rate, capacity = limits
+        return rate > 0 and capacity >= 1
+    except (TypeError, ValueError):
+        return False
+
+def check_rate_limit(payload):
+    budget = 'list' if request.method == 'GET' else 'write'
+    limits = app.config['RATE_LIMITS'].get(payload['role'], {}).get(budget)
+    # create_app() rejects invalid limits; one set on app.config directly is ignored
+    if not limits or not valid_rate_limit(limits):
+        return 0
+
+    key = f"{payload['user_id']}|{payload['role']}|{budget}"
+    try:
+        return get_rate_buckets().take(key, *limits)
+    except sqlite3.Error:
+        # Rate limiting fails open rather than turning every request into a 500
+        return 0
+
+# Group commit: writes from concurrent requests are queued and a single writer
+# thread runs them in one transaction, so the whole batch pays for one commit.
+class PendingWrite:
+    def __init__(self, query, params):
+        self.query = query
+        self.params = params
+        self.rowcount = None
+        self.error = None
+        self.started = False
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    # Called by the writer thread; a write whose request already timed out is skipped
+    def start(self):
+        with self.lock:
+            if self.cancelled:
+                return False
+            self.started = True
+            return True
+
+    def cancel(self):
+        with self.lock:
+            if not self.started:
+                self.cancelled = True
+            return self.cancelled
+
+class GroupCommitter:
+    def __init__(self, flask_app, window_ms, max_batch, timeout):
+        self.app = flask_app
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, query, params):
+        write = PendingWrite(query, params)
+        self.pending.put(write)
+        if not write.done.wait(self.timeout):
+            if write.cancel():
+                raise TimeoutError("Group commit timed out, the write was not applied")
+            raise TimeoutError("Group commit timed out, the write may or may not have been applied")
+        if write.error is not None:
+            raise write.error
+        return write.rowcount
+
+    def collect(self):
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return [write for write in batch if write.start()]
+
+    # The writer keeps one app context, and so one MySQL connection, for its whole life.
+    # MySQL drops connections left idle past wait_timeout, so the connection is pinged
+    # before each batch. After a dead connection or a failed batch the context is
+    # replaced so the next statement reconnects.
+    def run(self):
+        context = self.app.app_context()
+        context.push()
+        while True:
+            batch = self.collect()
+            if not batch:
+                continue
+            if not self.connection_alive():
+                context = self.reconnect(context)
+            if not self.commit_batch(batch):
+                context = self.reconnect(context)
+
+    def connection_alive(self):
+        try:
+            mysql.connection.ping()
+            return True
+        except Exception:
+            return False
+
+    def reconnect(self, context):
+        try:
+            context.pop()
+        except Exception:
+            pass
+        context = self.app.app_context()
+        context.push()
+        return context
+
+    def commit_batch(self, batch):
+        try:
+            connection = mysql.connection
+            cursor = connection.cursor()
+            # Each statement gets its own savepoint so one bad row only fails its own request
+            for write in batch:
+                cursor.execute("SAVEPOINT group_write")
+                try:
+                    cursor.execute(write.query, write.params)
+                    write.rowcount = cursor.rowcount
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT group_write")
+                    write.error = e
+            connection.commit()
+            return True
+        except Exception as e:
+            try:
+                mysql.connection.rollback()
+            except Exception:
+                pass
+            for write in batch:
+                if write.error is None:
+                    write.error = e
+            return False
+        finally:
+            for write in batch:
+                write.done.set()
+
+group_committer = None
+group_committer_lock = threading.Lock()
+
+def get_group_committer():
+    global group_committer
+    if group_committer is None:
+        with group_committer_lock:
+            if group_committer is None:
+                group_committer = GroupCommitter(
+                    app,
+                    app.config['GROUP_COMMIT_WINDOW_MS'],
+                    app.config['GROUP_COMMIT_MAX_BATCH'],
+                    app.config['GROUP_COMMIT_TIMEOUT_SECONDS'],
+                )
+    return group_committer
+
+def execute_write(query, params):
+    if app.config['GROUP_COMMIT']:
+        return get_group_committer().submit(query, params)
+
+    cursor = mysql.connection.cursor()
+    cursor.execute(query, params)
+    mysql.connection.commit()
+    return cursor.rowcount
+
+# Read replicas: GET handlers read from replicas in round-robin order. A background
+# probe runs SELECT 1 and checks replication lag on every replica each
+# REPLICA_HEALTH_CHECK_SECONDS. Unhealthy or lagging replicas are skipped. A replica that
+# refuses a request's connection is skipped until REPLICA_RETRY_SECONDS have passed.
+class ReplicaPool:
+    def __init__(self, hosts, retry_seconds):
+        self.hosts = list(hosts)
+        self.retry_seconds = retry_seconds
+        self.down_until = {}
+        self.unhealthy = set()
+        self.next_index = 0
+        self.lock = threading.Lock()
+
+    def candidates(self):
+        with self.lock:
+            start = self.next_index
+            self.next_index = (self.next_index + 1) % len(self.hosts)
+            now = time.monotonic()
+            ordered = self.hosts[start:] + self.hosts[:start]
+            return [host for host in ordered
+                    if host not in self.unhealthy and self.down_until.get(host, 0) <= now]
+
+    def mark_down(self, host):
+        with self.lock:
+            self.down_until[host] = time.monotonic() + self.retry_seconds
+
+    def open(self, host):
+        hostname, _, port = host.partition(":")
+        return MySQLdb.connect(
+            host=hostname,
+            port=int(port or app.config.get('MYSQL_PORT', 3306)),
+            user=app.config['MYSQL_USER'],
+            passwd=app.config['MYSQL_PASSWORD'],
+            db=app.config['MYSQL_DB'],
+            connect_timeout=app.config['REPLICA_CONNECT_TIMEOUT'],
+        )
+
+    def connect(self):
+        for host in self.candidates():
+            try:
+                return self.open(host)
+            except MySQLdb.OperationalError:
+                self.mark_down(host)
+        return None
+
+    def probe(self, host):
+        try:
+            connection = self.open(host)
+        except MySQLdb.Error:
+            return False
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            lag = replication_lag(connection)
+            return lag is not None and lag <= app.config['REPLICA_MAX_LAG_SECONDS']
+        except MySQLdb.Error:
+            return False
+        finally:
+            connection.close()
+
+    def check_health(self):
+        results = {host: self.probe(host) for host in self.hosts}
+        with self.lock:
+            self.unhealthy = {host for host, healthy in results.items() if not healthy}
+            for host, healthy in results.items():
+                if healthy:
+                    self.down_until.pop(host, None)
+
+    def monitor(self):
+        while True:
+            time.sleep(app.config['REPLICA_HEALTH_CHECK_SECONDS'])
+            self.check_health()
+
+# Seconds behind the primary, or None when replication is stopped. A server that is not
+# replicating, or a user without permission to read the status, counts as no lag.
+def replication_lag(connection):
+    cursor = connection.cursor(MySQLdb.cursors.DictCursor)
+    for statement in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):
+        try:
+            cursor.execute(statement)
+        except MySQLdb.Error:
+            continue
+        status = cursor.fetchone()
+        if not status:
+            return 0
+        if "Seconds_Behind_Source" in status:
+            return status["Seconds_Behind_Source"]
+        return status.get("Seconds_Behind_Master")
+    return 0
+
+replica_pool = None
+replica_pool_lock = threading.Lock()
+
+def get_replica_pool():
+    global replica_pool
+    if replica_pool is None:
+        with replica_pool_lock:
+            if replica_pool is None:
+                replica_pool = ReplicaPool(app.config['MYSQL_REPLICAS'], app.config['REPLICA_RETRY_SECONDS'])
+                threading.Thread(target=replica_pool.monitor, daemon=True).start()
+    return replica_pool
+
+# Read-your-writes: after a write, the user reads from the primary for a short window.
+# Pins are stored by user_id in the shared state file, so they hold no matter which
+# worker process serves the next request and whether or not the client keeps cookies.
+class PrimaryPins(SharedState):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS primary_pins (user_id TEXT PRIMARY KEY, until REAL NOT NULL)
+    """
+
+    def pin(self, user_id, seconds):
+        connection = self.connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("INSERT OR REPLACE INTO primary_pins (user_id, until) VALUES (?, ?)",
+                               (user_id, now + seconds))
+            connection.execute("DELETE FROM primary_pins WHERE until < ?", (now,))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def is_pinned(self, user_id):
+        pin = self.connection().execute("SELECT until FROM primary_pins WHERE user_id = ?", (user_id,)).fetchone()
+        return pin is not None and pin[0] > time.time()
+
+primary_pins = None
+primary_pins_lock = threading.Lock()
+
+def get_primary_pins():
+    global primary_pins
+    if primary_pins is None:
+        with primary_pins_lock:
+            if primary_pins is None:
+                primary_pins = PrimaryPins(app.config['SHARED_STATE_DB'])
+    return primary_pins
+
+# Routes without token_required, such as GET /api/activities, are pinned too when the
+# request carries a valid bearer token
+def request_user_id():
+    user = getattr(request, "user", None)
+    if user:
+        return user['user_id']
+
+    token = request.headers.get('Authorization')
+    if not token:
+        return None
+    payload = verify_jwt(token.split(" ")[1] if " " in token else token)
+    return payload['user_id'] if payload else None
+
+def is_pinned_to_primary():
+    user_id = request_user_id()
+    if not user_id:
+        return False
+    try:
+        return get_primary_pins().is_pinned(user_id)
+    except sqlite3.Error:
+        # Without the pin store, reading from the primary is the safe choice
+        return True
+
+def read_connection():
+    if not app.config['MYSQL_REPLICAS'] or is_pinned_to_primary():
+        return mysql.connection
+
+    if 'replica_connection' not in g:
+        g.replica_connection = get_replica_pool().connect()
+
+    # Every replica is down, so fall back to the primary
+    if g.replica_connection is None:
+        return mysql.connection
+    return g.replica_connection
+
+@app.teardown_appcontext
+def close_replica_connection(exception):
+    connection = g.pop('replica_connection', None)
+    if connection is not None:
+        connection.close()
+
+@app.after_request
+def pin_writer_to_primary(response):
+    user = getattr(request, "user", None)
+    if (app.config['MYSQL_REPLICAS'] and user and request.method in ("POST", "PUT", "DELETE")
+            and response.status_code < 400):
+        try:
+            get_primary_pins().pin(user['user_id'], app.config['READ_YOUR_WRITES_SECONDS'])
+        except sqlite3.Error:
+            # The write already succeeded; failing the response would only invite a retry
+            pass
+    return response
+
+# Inventory summary: dashboard totals kept in memory. They are loaded from the database
+# once, updated by the write handlers and reloaded every SUMMARY_RECONCILE_SECONDS.
+# Each worker process keeps its own copy and only applies its own writes, so under
+# SERVER.py a worker can lag behind writes made through other workers until its next reload.
+class InventorySummary:
+    LOAD_ATTEMPTS = 3
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.version = 0
+        self.items = {}
+        self.stock_by_type = {}
+        self.items_by_type = {}
+        self.below_reorder = 0
+        self.supplier_counts = {}
+        self.activity_usage = {}
+        self.total_usage = 0
+        self.reconciled_at = None
+        self.cached = None
+
+    # A write applied while the SELECTs run could be missing from their results, so a load
+    # that overlaps with a write is retried. If writes keep overlapping, the last attempt
+    # is kept but left unloaded, so the next read reloads again.
+    def load(self, cursor):
+        for attempt in range(self.LOAD_ATTEMPTS):
+            with self.lock:
+                version = self.version
+
+            cursor.execute(STOCK_LEVELS_QUERY)
+            items = cursor.fetchall()
+            cursor.execute("SELECT item_code, COUNT(*) FROM inventory_suppliers GROUP BY item_code")
+            supplier_counts = cursor.fetchall()
+            cursor.execute("SELECT activity_code, average_monthly_usage FROM Activities")
+            activities = cursor.fetchall()
+
+            with self.lock:
+                if self.version != version and attempt < self.LOAD_ATTEMPTS - 1:
+                    continue
+                self.items = {}
+                self.stock_by_type = {}
+                self.items_by_type = {}
+                self.below_reorder = 0
+                self.activity_usage = {}
+                self.total_usage = 0
+                for item_code, _, item_type_name, quantity_in_stock, reorder_level in items:
+                    self._put_item(item_code, item_type_name, quantity_in_stock, reorder_level)
+                self.supplier_counts = {str(item_code): count for item_code, count in supplier_counts}
+                for activity in activities:
+                    self._put_activity(*activity)
+                self.reconciled_at = datetime.utcnow()
+                self.loaded = self.version == version
+                self.cached = None
+                return
+
+    # Any failed update marks the summary for a full reload on the next read
+    def invalidate(self):
+        with self.lock:
+            self.loaded = False
+
+    def apply(self, change, *args):
+        with self.lock:
+            self.version += 1
+            if not self.loaded:
+                return
+            try:
+                change(*args)
+                self.cached = None
+            except Exception:
+                self.loaded = False
+
+    def _put_item(self, item_code, item_type_name, quantity_in_stock, reorder_level):
+        self._remove_item(item_code)
+        quantity_in_stock = int(quantity_in_stock)
+        reorder_level = int(reorder_level)
+        self.items[str(item_code)] = (item_type_name, quantity_in_stock, reorder_level)
+        self.stock_by_type[item_type_name] = self.stock_by_type.get(item_type_name, 0) + quantity_in_stock
+        self.items_by_type[item_type_name] = self.items_by_type.get(item_type_name, 0) + 1
+        if quantity_in_stock < reorder_level:
+            self.below_reorder += 1
+
+    def _remove_item(self, item_code):
+        item = self.items.pop(str(item_code), None)
+        if item is None:
+            return
+        item_type_name, quantity_in_stock, reorder_level = item
+        self.stock_by_type[item_type_name] -= quantity_in_stock
+        self.items_by_type[item_type_name] -= 1
+        if self.items_by_type[item_type_name] == 0:
+            del self.stock_by_type[item_type_name]
+            del self.items_by_type[item_type_name]
+        if quantity_in_stock < reorder_level:
+            self.below_reorder -= 1
+
+    def _adjust_stock(self, item_code, delta):
+        item = self.items.get(str(item_code))
+        if item is not None:
+            self._put_item(item_code, item[0], item[1] + delta, item[2])
+
+    def _add_supplier(self, item_code):
+        self.supplier_counts[str(item_code)] = self.supplier_counts.get(str(item_code), 0) + 1
+
+    def _remove_suppliers(self, item_code):
+        self.supplier_counts.pop(str(item_code), None)
+
+    def _put_activity(self, activity_code, average_monthly_usage):
+        self._remove_activity(activity_code)
+        average_monthly_usage = float(average_monthly_usage)
+        self.activity_usage[str(activity_code)] = average_monthly_usage
+        self.total_usage += average_monthly_usage
+
+    def _remove_activity(self, activity_code):
+        self.total_usage -= self.activity_usage.pop(str(activity_code), 0)
+
+    def put_item(self, item_code, item_type_name, quantity_in_stock, reorder_level):
+        self.apply(self._put_item, item_code, item_type_name, quantity_in_stock, reorder_level)
+
+    def remove_item(self, item_code):
+        self.apply(self._remove_item, item_code)
+
+    def adjust_stock(self, item_code, delta):
+        self.apply(self._adjust_stock, item_code, delta)
+
+    def add_supplier(self, item_code):
+        self.apply(self._add_supplier, item_code)
+
+    def remove_suppliers(self, item_code):
+        self.apply(self._remove_suppliers, item_code)
+
+    def put_activity(self, activity_code, average_monthly_usage):
+        self.apply(self._put_activity, activity_code, average_monthly_usage)
+
+    def remove_activity(self, activity_code):
+        self.apply(self._remove_activity, activity_code)
+
+    # The response is rebuilt only after a change, so repeated dashboard reads are free
+    def snapshot(self):
+        with self.lock:
+            if self.cached is None:
+                self.cached = {
+                    "stock_by_item_type": dict(self.stock_by_type),
+                    "items_below_reorder_level": self.below_reorder,
+                    "suppliers_per_item": dict(self.supplier_counts),
+                    "total_monthly_usage": self.total_usage,
+                    "last_reconciled": self.reconciled_at.isoformat() if self.reconciled_at else None,
+                }
+            return self.cached
+
+inventory_summary = InventorySummary()
+summary_reconciler = None
+summary_reconciler_lock = threading.Lock()
+
+def reconcile_summary():
+    while True:
+        time.sleep(app.config['SUMMARY_RECONCILE_SECONDS'])
+        try:
+            with app.app_context():
+                ensure_stock_tables()
+                inventory_summary.load(mysql.connection.cursor())
+        except Exception:
+            inventory_summary.invalidate()
+
+def start_summary_reconciler():
+    global summary_reconciler
+    if summary_reconciler is None:
+        with summary_reconciler_lock:
+            if summary_reconciler is None:
+                summary_reconciler = threading.Thread(target=reconcile_summary, daemon=True)
+                summary_reconciler.start()
+
+# Stock ledger: every receipt, issue and adjustment is appended to stock_movements.
+# Current stock is the latest row in stock_snapshots plus the movements after it.
+# Inventory.quantity_in_stock is only the opening balance for items with no snapshot yet;
+# it is never updated, and every stock read goes through the ledger.
+STOCK_MOVEMENT_TYPES = ("receipt", "issue", "adjustment")
+
+# Inventory rows with quantity_in_stock replaced by the ledger's current stock
+STOCK_LEVELS_QUERY = """
+    SELECT i.item_code, i.item_description, i.item_type_name,
+           CAST(COALESCE(s.quantity, i.quantity_in_stock) + COALESCE((
+               SELECT SUM(m.quantity) FROM stock_movements m
+               WHERE m.item_code = i.item_code AND m.movement_id > COALESCE(s.movement_id, 0)
+           ), 0) AS SIGNED) AS quantity_in_stock,
+           i.reorder_level
+    FROM Inventory i
+    LEFT JOIN stock_snapshots s ON s.item_code = i.item_code AND s.movement_id = (
+        SELECT MAX(movement_id) FROM stock_snapshots WHERE item_code = i.item_code
+    )
+"""
+
+stock_tables_ready = False
+stock_tables_lock = threading.Lock()
+
+def ensure_stock_tables():
+    global stock_tables_ready
+    if stock_tables_ready:
+        return
+    with stock_tables_lock:
+        if stock_tables_ready:
+            return
+        cursor = mysql.connection.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_movements (
+                movement_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                item_code INT NOT NULL,
+                movement_type VARCHAR(20) NOT NULL,
+                quantity INT NOT NULL,
+                note VARCHAR(255),
+                created_by VARCHAR(255),
+                created_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+                INDEX idx_stock_movements_item (item_code, movement_id),
+                INDEX idx_stock_movements_time (item_code, created_at)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_snapshots (
+                item_code INT NOT NULL,
+                movement_id BIGINT NOT NULL,
+                quantity INT NOT NULL,
+                taken_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+                PRIMARY KEY (item_code, movement_id)
+            )
+        """)
+        stock_tables_ready = True
+
+# Items without a snapshot start from Inventory.quantity_in_stock
+def read_stock_level(cursor, item_code, upto=None):
+    upto_clause = " AND movement_id <= %s" if upto is not None else ""
+    upto_params = (upto,) if upto is not None else ()
+
+    cursor.execute("SELECT movement_id, quantity FROM stock_snapshots WHERE item_code = %s" + upto_clause +
+                   " ORDER BY movement_id DESC LIMIT 1", (item_code,) + upto_params)
+    snapshot = cursor.fetchone()
+    if snapshot:
+        since, quantity = snapshot
+    else:
+        cursor.execute("SELECT quantity_in_stock FROM Inventory WHERE item_code = %s", (item_code,))
+        item = cursor.fetchone()
+        if not item:
+            return None
+        since, quantity = 0, item[0]
+
+    cursor.execute("SELECT COALESCE(SUM(quantity), 0) FROM stock_movements WHERE item_code = %s AND movement_id > %s" +
+                   upto_clause, (item_code, since) + upto_params)
+    return int(quantity) + int(cursor.fetchone()[0])
+
+# Snapshots only cover movements older than STOCK_SNAPSHOT_LAG_SECONDS, so a movement
+# whose transaction commits late is never skipped
+def take_stock_snapshots(cursor):
+    cursor.execute("SELECT COALESCE(MAX(movement_id), 0) FROM stock_snapshots")
+    watermark = cursor.fetchone()[0]
+    cursor.execute("SELECT MAX(movement_id) FROM stock_movements WHERE created_at < NOW(6) - INTERVAL %s SECOND",
+                   (app.config['STOCK_SNAPSHOT_LAG_SECONDS'],))
+    upto = cursor.fetchone()[0]
+    if not upto or upto <= watermark:
+        return 0
+
+    cursor.execute("SELECT DISTINCT item_code FROM stock_movements WHERE movement_id > %s AND movement_id <= %s",
+                   (watermark, upto))
+    item_codes = [row[0] for row in cursor.fetchall()]
+    for item_code in item_codes:
+        quantity = read_stock_level(cursor, item_code, upto)
+        if quantity is not None:
+            cursor.execute("INSERT IGNORE INTO stock_snapshots (item_code, movement_id, quantity) VALUES (%s, %s, %s)",
+                           (item_code, upto, quantity))
+    mysql.connection.commit()
+    return len(item_codes)
+
+stock_snapshotter = None
+stock_snapshotter_lock = threading.Lock()
+
+def snapshot_stock():
+    while True:
+        time.sleep(app.config['STOCK_SNAPSHOT_SECONDS'])
+        try:
+            with app.app_context():
+                take_stock_snapshots(mysql.connection.cursor())
+        except Exception:
+            pass
+
+def start_stock_snapshotter():
+    global stock_snapshotter
+    if stock_snapshotter is None:
+        with stock_snapshotter_lock:
+            if stock_snapshotter is None:
+                stock_snapshotter = threading.Thread(target=snapshot_stock, daemon=True)
+                stock_snapshotter.start()
+
+# Current stock per item. Movements recorded by this process adjust the cached value;
+# movements from other processes show up once the entry is older than STOCK_CACHE_SECONDS.
+# A load that overlaps with a movement is not stored, so it cannot overwrite the newer value.
+class StockCache:
+    def __init__(self):
+        self.entries = {}
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, item_code):
+        with self.lock:
+            entry = self.entries.get(item_code)
+            if entry and time.monotonic() - entry[1] < app.config['STOCK_CACHE_SECONDS']:
+                return entry[0]
+            return None
+
+    def version(self, item_code):
+        with self.lock:
+            return self.versions.get(item_code, 0)
+
+    def put(self, item_code, quantity, version):
+        with self.lock:
+            if self.versions.get(item_code, 0) == version:
+                self.entries[item_code] = (quantity, time.monotonic())
+
+    def apply(self, item_code, delta):
+        with self.lock:
+            self.versions[item_code] = self.versions.get(item_code, 0) + 1
+            entry = self.entries.get(item_code)
+            if entry:
+                self.entries[item_code] = (entry[0] + delta, entry[1])
+
+    def remove(self, item_code):
+        with self.lock:
+            self.versions[item_code] = self.versions.get(item_code, 0) + 1
+            self.entries.pop(item_code, None)
+
+stock_cache = StockCache()
+
+INSERT_STOCK_MOVEMENT = """
+    INSERT INTO stock_movements (item_code, movement_type, quantity, note, created_by)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+def record_stock_movement(item_code, movement_type, delta, note, created_by):
+    ensure_stock_tables()
+    start_stock_snapshotter()
+    execute_write(INSERT_STOCK_MOVEMENT, (item_code, movement_type, delta, note, created_by))
+    stock_cache.apply(item_code, delta)
+    inventory_summary.adjust_stock(item_code, delta)
+
 @app.route("/", methods=["GET"])
 def welcome():
     return render_template_string("""
@@ -71,6 +938,10 @@ def token_required(roles=None):
             if roles and payload['role'] not in roles:
                 return handle_error('You do not have permission to access this resource', HTTPStatus.FORBIDDEN)
 
+            retry_after = check_rate_limit(payload)
+            if retry_after:
+                return handle_overload('Rate limit exceeded', HTTPStatus.TOO_MANY_REQUESTS, retry_after)
+
             request.user = payload
             return f(*args, **kwargs)
 
@@ -79,6 +950,8 @@ def token_required(roles=None):
     return decorator
 
 def load_users():
+    if not os.path.exists(USER_DATA_FILE):
+        return {}
     with open(USER_DATA_FILE, 'r') as f:
         return json.load(f)
 
@@ -140,8 +1013,9 @@ def login():
 @token_required(roles=["admin"])
 def get_inventory():
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Inventory")
+        ensure_stock_tables()
+        cursor = read_connection().cursor()
+        cursor.execute(STOCK_LEVELS_QUERY)
         inventory_items = cursor.fetchall()
 
         if not inventory_items:
@@ -166,7 +1040,7 @@ def get_inventory():
 @token_required(roles=["admin" , "user"])
 def get_suppliers():
     try:
-        cursor = mysql.connection.cursor()
+        cursor = read_connection().cursor()
         cursor.execute("SELECT * FROM Suppliers")
         suppliers = cursor.fetchall()
 
@@ -189,7 +1063,7 @@ def get_suppliers():
 @app.route("/api/activities", methods=["GET"])
 def get_activities():
     try:
-        cursor = mysql.connection.cursor()
+        cursor = read_connection().cursor()
         cursor.execute("SELECT * FROM Activities")
         activities = cursor.fetchall()
 
@@ -214,7 +1088,7 @@ def get_activities():
 @token_required(roles=["admin"])
 def get_inventory_suppliers():
     try:
-        cursor = mysql.connection.cursor()
+        cursor = read_connection().cursor()
         cursor.execute("SELECT * FROM inventory_suppliers")
         inventory_suppliers = cursor.fetchall()
 
@@ -245,12 +1119,12 @@ def create_inventory():
             if field not in data:
                 return handle_error(f"Missing required field: {field}", 400)
 
-        cursor = mysql.connection.cursor()
-        cursor.execute("""
+        execute_write("""
             INSERT INTO Inventory (item_code, item_description, item_type_name, quantity_in_stock, reorder_level)
             VALUES (%s, %s, %s, %s, %s)
         """, (data["item_code"], data["item_description"], data["item_type_name"], data["quantity_in_stock"], data["reorder_level"]))
-        mysql.connection.commit()
+
+        inventory_summary.put_item(data["item_code"], data["item_type_name"], data["quantity_in_stock"], data["reorder_level"])
 
         return jsonify({"success": True, "message": "Inventory item created successfully"}), 201
     except Exception as e:
@@ -267,12 +1141,10 @@ def create_supplier():
             if field not in data:
                 return handle_error(f"Missing required field: {field}", 400)
 
-        cursor = mysql.connection.cursor()
-        cursor.execute("""
+        execute_write("""
             INSERT INTO Suppliers (supplier_code, supplier_name, supplier_phone)
             VALUES (%s, %s, %s)
         """, (data["supplier_code"], data["supplier_name"], data["supplier_phone"]))
-        mysql.connection.commit()
 
         return jsonify({"success": True, "message": "Supplier created successfully"}), 201
     except Exception as e:
@@ -289,12 +1161,12 @@ def create_activity():
             if field not in data:
                 return handle_error(f"Missing required field: {field}", 400)
 
-        cursor = mysql.connection.cursor()
-        cursor.execute("""
+        execute_write("""
             INSERT INTO Activities (activity_code, activity_description, item_code, average_monthly_usage)
             VALUES (%s, %s, %s, %s)
         """, (data["activity_code"], data["activity_description"], data["item_code"], data["average_monthly_usage"]))
-        mysql.connection.commit()
+
+        inventory_summary.put_activity(data["activity_code"], data["average_monthly_usage"])
 
         return jsonify({"success": True, "message": "Activity created successfully"}), 201
     except Exception as e:
@@ -311,12 +1183,12 @@ def create_inventory_supplier():
             if field not in data:
                 return handle_error(f"Missing required field: {field}", 400)
 
-        cursor = mysql.connection.cursor()
-        cursor.execute("""
+        execute_write("""
             INSERT INTO inventory_suppliers (item_code, supplier_code)
             VALUES (%s, %s)
         """, (data["item_code"], data["supplier_code"]))
-        mysql.connection.commit()
+
+        inventory_summary.add_supplier(data["item_code"])
 
         return jsonify({"success": True, "message": "Inventory supplier created successfully"}), 201
     except Exception as e:
@@ -328,13 +1200,23 @@ def create_inventory_supplier():
 def delete_inventory_item(item_code):
     try:
         # Logic for deleting the item
+        ensure_stock_tables()
         cursor = mysql.connection.cursor()
         cursor.execute("DELETE FROM Inventory WHERE item_code = %s", (item_code,))
-        mysql.connection.commit()
 
         if cursor.rowcount == 0:
+            mysql.connection.rollback()
             return handle_error("Item not found", HTTPStatus.NOT_FOUND)
 
+        # The ledger goes with the item, so a new item reusing the code starts from its own
+        # opening balance instead of the old snapshots and movements
+        cursor.execute("DELETE FROM stock_movements WHERE item_code = %s", (item_code,))
+        cursor.execute("DELETE FROM stock_snapshots WHERE item_code = %s", (item_code,))
+        mysql.connection.commit()
+
+        stock_cache.remove(int(item_code))
+        inventory_summary.remove_item(item_code)
+
         return jsonify({"success": True, "message": "Item deleted successfully"}), HTTPStatus.OK
     except Exception as e:
         return handle_error(f"An error occurred: {str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR)
@@ -372,6 +1254,8 @@ def delete_activities_item(activity_code):
         cursor.execute("DELETE FROM activities WHERE activity_code = %s", (activity_code,))
         mysql.connection.commit()
 
+        inventory_summary.remove_activity(activity_code)
+
         return jsonify({"success": True, "message": f"Item with code {activity_code} deleted successfully"}), 200
     except Exception as e:
         return handle_error(str(e), 500)
@@ -390,6 +1274,8 @@ def delete_inventory_suppliers_item(item_code):
         cursor.execute("DELETE FROM inventory_suppliers WHERE item_code = %s", (item_code,))
         mysql.connection.commit()
 
+        inventory_summary.remove_suppliers(item_code)
+
         return jsonify({"success": True, "message": f"Item with code {item_code} deleted successfully"}), 200
     except Exception as e:
         return handle_error(str(e), 500)
@@ -399,33 +1285,61 @@ def delete_inventory_suppliers_item(item_code):
 @token_required(roles=["admin"])
 def update_inventory_item(item_code):
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Inventory WHERE item_code = %s", (item_code,))
+        data = request.get_json()
+
+        if not data:
+            return handle_error("No data provided for update", 400)
+
+        new_stock = data.get("quantity_in_stock")
+        if new_stock is not None:
+            try:
+                new_stock = int(new_stock)
+            except (TypeError, ValueError):
+                return handle_error("quantity_in_stock must be an integer", 400)
+
+        ensure_stock_tables()
+        start_stock_snapshotter()
+        connection = mysql.connection
+        cursor = connection.cursor()
+        # The row lock makes concurrent updates of one item take turns, so each one
+        # computes its adjustment from the level the previous one committed
+        cursor.execute("SELECT * FROM Inventory WHERE item_code = %s FOR UPDATE", (item_code,))
         item = cursor.fetchone()
 
         if not item:
+            connection.rollback()
             return handle_error("Item not found", 404)
 
-        data = request.get_json()
-
-        if not data:
-            return handle_error("No data provided for update", 400)
+        current_stock = read_stock_level(cursor, item_code)
+        if new_stock is None:
+            new_stock = current_stock
 
         update_query = """
         UPDATE Inventory 
-        SET item_description = %s, item_type_name = %s, quantity_in_stock = %s, reorder_level = %s 
+        SET item_description = %s, item_type_name = %s, reorder_level = %s 
         WHERE item_code = %s
         """
         values = (
             data.get("item_description", item[1]),  
             data.get("item_type_name", item[2]),
-            data.get("quantity_in_stock", item[3]),
             data.get("reorder_level", item[4]),
             item_code
         )
 
         cursor.execute(update_query, values)
-        mysql.connection.commit()
+
+        # Stock only changes through the ledger, so a new quantity is recorded as an
+        # adjustment. It is written in this transaction rather than through group commit,
+        # so the item fields and the stock change are committed or rolled back together.
+        delta = new_stock - current_stock
+        if delta:
+            cursor.execute(INSERT_STOCK_MOVEMENT, (item_code, "adjustment", delta, "Set by inventory update",
+                                                   request.user["user_id"]))
+        connection.commit()
+
+        if delta:
+            stock_cache.apply(item_code, delta)
+        inventory_summary.put_item(item_code, values[1], new_stock, values[2])
 
         return jsonify({"success": True, "message": f"Item with code {item_code} updated successfully"}), 200
     except Exception as e:
@@ -496,6 +1410,8 @@ def update_activities_item(activity_code):
         cursor.execute(update_query, values)
         mysql.connection.commit()
 
+        inventory_summary.put_activity(activity_code, values[2])
+
         return jsonify({"success": True, "message": f"Activity with code {activity_code} updated successfully"}), 200
     except Exception as e:
         return handle_error(str(e), 500)
@@ -532,6 +1448,126 @@ def update_inventory_suppliers_item(item_code):
         return jsonify({"success": True, "message": f"Inventory supplier record with item code {item_code} updated successfully"}), 200
     except Exception as e:
         return handle_error(str(e), 500)
+#SUMMARY
+@app.route("/api/summary", methods=["GET"])
+@token_required(roles=["admin"])
+def get_summary():
+    try:
+        if not inventory_summary.loaded:
+            ensure_stock_tables()
+            inventory_summary.load(mysql.connection.cursor())
+            start_summary_reconciler()
+
+        return jsonify({"success": True, "data": inventory_summary.snapshot()}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+#STOCK LEDGER
+@app.route("/api/add/stock_movements", methods=["POST"])
+@token_required(roles=["admin", "user"])
+def create_stock_movement():
+    try:
+        data = request.get_json()
+        required_fields = ["item_code", "movement_type", "quantity"]
+
+        for field in required_fields:
+            if field not in data:
+                return handle_error(f"Missing required field: {field}", 400)
+
+        movement_type = data["movement_type"]
+        if movement_type not in STOCK_MOVEMENT_TYPES:
+            return handle_error(f"movement_type must be one of: {', '.join(STOCK_MOVEMENT_TYPES)}", 400)
+
+        try:
+            item_code = int(data["item_code"])
+            quantity = int(data["quantity"])
+        except (TypeError, ValueError):
+            return handle_error("item_code and quantity must be integers", 400)
+
+        # Receipts and issues are given as positive amounts; adjustments carry their own sign
+        if movement_type != "adjustment" and quantity <= 0:
+            return handle_error("quantity must be positive for receipts and issues", 400)
+        delta = -quantity if movement_type == "issue" else quantity
+
+        cursor = mysql.connection.cursor()
+        cursor.execute("SELECT 1 FROM Inventory WHERE item_code = %s", (item_code,))
+        if not cursor.fetchone():
+            return handle_error("Item not found", 404)
+
+        record_stock_movement(item_code, movement_type, delta, data.get("note"), request.user["user_id"])
+
+        return jsonify({"success": True, "message": "Stock movement recorded successfully"}), 201
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/stock/<int:item_code>", methods=["GET"])
+@token_required(roles=["admin", "user"])
+def get_stock_level(item_code):
+    try:
+        quantity = stock_cache.get(item_code)
+        if quantity is None:
+            ensure_stock_tables()
+            start_stock_snapshotter()
+            # The cache is shared by every user, so it is only filled from the primary;
+            # a lagging replica could otherwise hide a user's own movement
+            version = stock_cache.version(item_code)
+            quantity = read_stock_level(mysql.connection.cursor(), item_code)
+            if quantity is None:
+                return handle_error("Item not found", 404)
+            stock_cache.put(item_code, quantity, version)
+
+        return jsonify({"success": True, "data": {"item_code": item_code, "quantity_in_stock": quantity}}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/stock/<int:item_code>/history", methods=["GET"])
+@token_required(roles=["admin", "user"])
+def get_stock_history(item_code):
+    try:
+        query = """
+            SELECT movement_id, movement_type, quantity, note, created_by, created_at
+            FROM stock_movements WHERE item_code = %s
+        """
+        values = [item_code]
+
+        try:
+            if request.args.get("start"):
+                query += " AND created_at >= %s"
+                values.append(datetime.fromisoformat(request.args["start"]))
+            if request.args.get("end"):
+                query += " AND created_at < %s"
+                values.append(datetime.fromisoformat(request.args["end"]))
+            limit = min(int(request.args.get("limit", 500)), 5000)
+        except ValueError:
+            return handle_error("start and end must be ISO 8601 timestamps and limit an integer", 400)
+
+        if limit < 1:
+            return handle_error("limit must be a positive integer", 400)
+
+        query += " ORDER BY movement_id LIMIT %s"
+        values.append(limit)
+
+        ensure_stock_tables()
+        cursor = read_connection().cursor()
+        cursor.execute(query, tuple(values))
+        movements = cursor.fetchall()
+
+        movements_list = [
+            {
+                "movement_id": movement[0],
+                "item_code": item_code,
+                "movement_type": movement[1],
+                "quantity": movement[2],
+                "note": movement[3],
+                "created_by": movement[4],
+                "created_at": movement[5].isoformat(),
+            }
+            for movement in movements
+        ]
+
+        return jsonify({"success": True, "data": movements_list, "total": len(movements_list)}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
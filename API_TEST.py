@@ -1,5 +1,10 @@
 import pytest
-from API import app  
+import threading
+import time
+import MySQLdb
+from datetime import datetime
+import API
+from API import app, mysql, GroupCommitter, ReplicaPool, InventorySummary, StockCache, SharedTokenBuckets, PrimaryPins, create_jwt, create_app
 
 @pytest.fixture
 def mock_db(mocker):
@@ -279,6 +284,402 @@ def test_post_inventory_supplier_success(mock_db):
     assert response.status_code == 201
     assert b"Inventory supplier created successfully" in response.data
 
+# Tests for group commit
+def test_group_commit_batches_writes_into_one_commit(mock_db):
+    def execute(query, params=None):
+        if query == "BAD INSERT":
+            raise Exception("Duplicate entry")
+        mock_db.rowcount = 1
+    mock_db.execute.side_effect = execute
+
+    committer = GroupCommitter(app, window_ms=500, max_batch=3, timeout=5)
+    results = {}
+
+    def submit(query):
+        try:
+            results[query] = committer.submit(query, ())
+        except Exception as e:
+            results[query] = str(e)
+
+    threads = [threading.Thread(target=submit, args=(query,)) for query in ["INSERT 1", "BAD INSERT", "INSERT 2"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {"INSERT 1": 1, "BAD INSERT": "Duplicate entry", "INSERT 2": 1}
+    assert mysql.connection.commit.call_count == 1
+
+def test_group_commit_times_out_when_writer_is_stuck(mock_db):
+    mock_db.execute.side_effect = lambda query, params=None: time.sleep(0.5)
+    committer = GroupCommitter(app, window_ms=0, max_batch=1, timeout=0.1)
+    first = threading.Thread(target=lambda: pytest.raises(TimeoutError, committer.submit, "SLOW INSERT", ()))
+    first.start()
+    time.sleep(0.05)
+
+    with pytest.raises(TimeoutError, match="was not applied"):
+        committer.submit("QUEUED INSERT", ())
+    first.join()
+
+    time.sleep(1.2)
+    executed = [call[0][0] for call in mock_db.execute.call_args_list]
+    assert "QUEUED INSERT" not in executed
+
+def test_group_commit_reconnects_when_connection_went_idle(mock_db, mocker):
+    mock_db.rowcount = 1
+    mysql.connection.ping.side_effect = MySQLdb.OperationalError(2006, "MySQL server has gone away")
+    reconnect = mocker.spy(GroupCommitter, "reconnect")
+
+    committer = GroupCommitter(app, window_ms=0, max_batch=1, timeout=5)
+
+    assert committer.submit("INSERT 1", ()) == 1
+    assert reconnect.call_count == 1
+    assert mysql.connection.commit.call_count == 1
+
+# Tests for read replicas
+def test_replica_pool_round_robin_skips_down_replica(mocker):
+    def connect(host, **kwargs):
+        if host == "replica-2":
+            raise MySQLdb.OperationalError("Can't connect")
+        return host
+    mocker.patch('MySQLdb.connect', side_effect=connect)
+
+    pool = ReplicaPool(["replica-1", "replica-2", "replica-3"], retry_seconds=60)
+
+    assert pool.connect() == "replica-1"
+    assert pool.connect() == "replica-3"
+    assert pool.connect() == "replica-3"
+    assert pool.connect() == "replica-1"
+
+def test_replica_health_check_skips_lagging_replica(mocker):
+    lags = {"replica-1": 0, "replica-2": 120}
+
+    def connect(host, **kwargs):
+        assert kwargs["connect_timeout"] == app.config["REPLICA_CONNECT_TIMEOUT"]
+        connection = mocker.MagicMock()
+        connection.cursor.return_value.fetchone.return_value = {"Seconds_Behind_Source": lags[host]}
+        return connection
+    mocker.patch('MySQLdb.connect', side_effect=connect)
+
+    pool = ReplicaPool(["replica-1", "replica-2"], retry_seconds=60)
+    pool.check_health()
+    assert pool.candidates() == ["replica-1"]
+
+    lags["replica-2"] = 1
+    pool.check_health()
+    assert sorted(pool.candidates()) == ["replica-1", "replica-2"]
+
+def test_reads_stay_on_primary_after_write(mock_db, mocker, tmp_path):
+    replica_cursor = mocker.MagicMock()
+    replica_cursor.fetchall.return_value = [(1, "ABC Supplies", "123-456-7890")]
+    replica = mocker.MagicMock()
+    replica.cursor.return_value = replica_cursor
+    mocker.patch('MySQLdb.connect', return_value=replica)
+    mocker.patch.dict(app.config, {"MYSQL_REPLICAS": ["replica-1"]})
+    mocker.patch('API.primary_pins', PrimaryPins(str(tmp_path / "shared.sqlite3")))
+    mock_db.fetchall.return_value = [(1, "ABC Supplies", "123-456-7890")]
+
+    headers = {"Authorization": f"Bearer {create_jwt('writer@example.com', 'user')}"}
+    # Bearer-token clients do not keep cookies, so each request uses a fresh client
+    client = app.test_client(use_cookies=False)
+
+    client.get('/api/suppliers', headers=headers)
+    assert replica_cursor.execute.call_count == 1
+
+    response = client.post('/api/add/suppliers', headers=headers, json={
+        "supplier_code": 2,
+        "supplier_name": "XYZ Supplies",
+        "supplier_phone": "987-654-3210"
+    })
+    assert response.status_code == 201
+
+    response = app.test_client(use_cookies=False).get('/api/suppliers', headers=headers)
+    assert response.status_code == 200
+    mock_db.fetchall.return_value = [(1, "Football", 1, 10)]
+    response = app.test_client(use_cookies=False).get('/api/activities', headers=headers)
+    assert response.status_code == 200
+    assert replica_cursor.execute.call_count == 1
+
+    other_user = {"Authorization": f"Bearer {create_jwt('reader@example.com', 'user')}"}
+    app.test_client(use_cookies=False).get('/api/suppliers', headers=other_user)
+    assert replica_cursor.execute.call_count == 2
+
+# Tests for admission control
+def test_rate_limit_returns_429_with_retry_after(mock_db, mocker, tmp_path):
+    mocker.patch.dict(app.config, {"RATE_LIMITS": {"user": {"list": (0.1, 2), "write": (20, 40)}}})
+    mocker.patch('API.rate_buckets', SharedTokenBuckets(str(tmp_path / "buckets.sqlite3")))
+    mock_db.fetchall.return_value = [(1, "ABC Supplies", "123-456-7890")]
+
+    headers = {"Authorization": f"Bearer {create_jwt('busy@example.com', 'user')}"}
+    client = app.test_client()
+
+    assert client.get('/api/suppliers', headers=headers).status_code == 200
+    assert client.get('/api/suppliers', headers=headers).status_code == 200
+
+    response = client.get('/api/suppliers', headers=headers)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+    assert b"Rate limit exceeded" in response.data
+
+def test_rate_limit_budget_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "buckets.sqlite3")
+    first_worker = SharedTokenBuckets(path)
+    second_worker = SharedTokenBuckets(path)
+
+    assert first_worker.take("busy@example.com|user|list", 0.1, 2) == 0
+    assert second_worker.take("busy@example.com|user|list", 0.1, 2) == 0
+    assert first_worker.take("busy@example.com|user|list", 0.1, 2) > 0
+
+def test_overload_returns_503(mock_db, mocker):
+    mocker.patch.dict(app.config, {"MAX_IN_FLIGHT": 0})
+
+    client = app.test_client()
+    response = client.get('/api/activities')
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_overload_uses_server_queue_depth(mock_db, mocker):
+    mocker.patch.dict(app.config, {"QUEUE_DEPTH": lambda: 65, "MAX_IN_FLIGHT": 64})
+
+    client = app.test_client()
+    response = client.get('/api/activities')
+
+    assert response.status_code == 503
+
+def test_request_counter_releases_after_response(mock_db):
+    mock_db.fetchall.return_value = [(1, "Football", 1, 10)]
+
+    client = app.test_client()
+    assert client.get('/api/activities').status_code == 200
+    assert client.get('/api/activities').status_code == 200
+
+    assert API.request_counter.depth() == 0
+
+def test_rate_limit_with_zero_rate_is_rejected(mock_db, mocker, tmp_path):
+    mocker.patch.dict(app.config, {"RATE_LIMITS": {"user": {"list": (0, 2), "write": (20, 40)}}})
+    mocker.patch('API.rate_buckets', SharedTokenBuckets(str(tmp_path / "buckets.sqlite3")))
+    mock_db.fetchall.return_value = [(1, "ABC Supplies", "123-456-7890")]
+
+    with pytest.raises(ValueError, match="RATE_LIMITS"):
+        create_app()
+
+    headers = {"Authorization": f"Bearer {create_jwt('busy@example.com', 'user')}"}
+    client = app.test_client()
+    for _ in range(3):
+        assert client.get('/api/suppliers', headers=headers).status_code == 200
+
+# Tests for the app factory
+def test_create_app_applies_config_overrides(mocker):
+    mocker.patch.dict(app.config)
+
+    created = create_app({"MYSQL_HOST": "db.internal", "MAX_IN_FLIGHT": 128})
+
+    assert created is app
+    assert created.config["MYSQL_HOST"] == "db.internal"
+    assert created.config["MAX_IN_FLIGHT"] == 128
+
+def test_create_app_reads_settings_from_environment(mocker, monkeypatch):
+    mocker.patch.dict(app.config)
+    monkeypatch.setenv("GROUP_COMMIT", "true")
+    monkeypatch.setenv("MYSQL_REPLICAS", "replica-1, replica-2:3307")
+    monkeypatch.setenv("RATE_LIMITS", '{"user": {"list": [1, 5]}}')
+
+    created = create_app()
+
+    assert created.config["GROUP_COMMIT"] is True
+    assert created.config["MYSQL_REPLICAS"] == ["replica-1", "replica-2:3307"]
+    assert created.config["RATE_LIMITS"] == {"user": {"list": [1, 5]}}
+
+# Tests for the inventory summary
+def test_inventory_summary_updates_incrementally(mocker):
+    cursor = mocker.MagicMock()
+    cursor.fetchall.side_effect = [
+        [(1, "Ball", "Balls", 20, 5), (2, "Ball", "Balls", 3, 5), (3, "Net", "Nets", 4, 2)],
+        [(1, 2), (3, 1)],
+        [(10, 30), (11, 12)],
+    ]
+    summary = InventorySummary()
+    summary.load(cursor)
+
+    summary.put_item("2", "Balls", 10, 5)
+    summary.remove_item(3)
+    summary.add_supplier(2)
+    summary.remove_suppliers("1")
+    summary.put_activity(12, 8)
+    summary.remove_activity("11")
+
+    data = summary.snapshot()
+    assert data["stock_by_item_type"] == {"Balls": 30}
+    assert data["items_below_reorder_level"] == 0
+    assert data["suppliers_per_item"] == {"3": 1, "2": 1}
+    assert data["total_monthly_usage"] == 38
+
+def test_inventory_summary_load_retries_when_a_write_overlaps(mocker):
+    summary = InventorySummary()
+    summary.loaded = True
+    cursor = mocker.MagicMock()
+    results = [
+        [(1, "Ball", "Balls", 20, 5)], [], [],
+        [(1, "Ball", "Balls", 20, 5), (2, "Net", "Nets", 4, 2)], [], [],
+    ]
+
+    def fetchall():
+        rows = results.pop(0)
+        # The new item is committed and applied right after the first Inventory SELECT
+        if len(results) == 5:
+            summary.put_item(2, "Nets", 4, 2)
+        return rows
+    cursor.fetchall.side_effect = fetchall
+
+    summary.load(cursor)
+
+    assert summary.loaded
+    assert summary.snapshot()["stock_by_item_type"] == {"Balls": 20, "Nets": 4}
+
+def test_get_summary_success(mock_db, mocker):
+    mocker.patch('API.inventory_summary', InventorySummary())
+    mocker.patch('API.start_summary_reconciler')
+    mock_db.fetchall.side_effect = [
+        [(1, "Ball", "Balls", 2, 5)],
+        [(1, 3)],
+        [(10, 30)],
+    ]
+
+    headers = {"Authorization": f"Bearer {create_jwt('manager@example.com', 'admin')}"}
+    client = app.test_client()
+    response = client.get('/api/summary', headers=headers)
+
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert data["stock_by_item_type"] == {"Balls": 2}
+    assert data["items_below_reorder_level"] == 1
+    assert data["suppliers_per_item"] == {"1": 3}
+    assert data["total_monthly_usage"] == 30
+
+# Tests for the stock ledger
+@pytest.fixture
+def stock_ledger(mocker):
+    mocker.patch('API.stock_tables_ready', True)
+    mocker.patch('API.start_stock_snapshotter')
+    return mocker.patch('API.stock_cache', StockCache())
+
+def test_post_stock_movement_invalid_type(mock_db, stock_ledger):
+    headers = {"Authorization": f"Bearer {create_jwt('terminal@example.com', 'user')}"}
+    client = app.test_client()
+    response = client.post('/api/add/stock_movements', headers=headers, json={
+        "item_code": 1,
+        "movement_type": "transfer",
+        "quantity": 5
+    })
+
+    assert response.status_code == 400
+    assert b"movement_type must be one of" in response.data
+
+def test_stock_level_from_snapshot_and_cached_movements(mock_db, stock_ledger):
+    mock_db.fetchone.side_effect = [(40, 20), (5,), (1,)]
+    headers = {"Authorization": f"Bearer {create_jwt('terminal@example.com', 'user')}"}
+    client = app.test_client()
+
+    response = client.get('/api/stock/1', headers=headers)
+    assert response.get_json()["data"] == {"item_code": 1, "quantity_in_stock": 25}
+
+    response = client.post('/api/add/stock_movements', headers=headers, json={
+        "item_code": 1,
+        "movement_type": "issue",
+        "quantity": 3
+    })
+    assert response.status_code == 201
+    assert mock_db.execute.call_args[0][1] == (1, "issue", -3, None, "terminal@example.com")
+
+    executed = mock_db.execute.call_count
+    response = client.get('/api/stock/1', headers=headers)
+    assert response.get_json()["data"] == {"item_code": 1, "quantity_in_stock": 22}
+    assert mock_db.execute.call_count == executed
+
+def test_get_stock_history_time_range(mock_db, stock_ledger):
+    mock_db.fetchall.return_value = [
+        (7, "receipt", 10, "Delivery", "admin@example.com", datetime(2024, 5, 1, 9, 30))
+    ]
+    headers = {"Authorization": f"Bearer {create_jwt('terminal@example.com', 'user')}"}
+    client = app.test_client()
+
+    response = client.get('/api/stock/1/history?start=2024-05-01&end=2024-05-02', headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json()["data"][0]["created_at"] == "2024-05-01T09:30:00"
+    assert mock_db.execute.call_args[0][1] == (1, datetime(2024, 5, 1), datetime(2024, 5, 2), 500)
+
+    response = client.get('/api/stock/1/history?start=yesterday', headers=headers)
+    assert response.status_code == 400
+
+    response = client.get('/api/stock/1/history?limit=-1', headers=headers)
+    assert response.status_code == 400
+
+def test_post_stock_movement_unknown_item(mock_db, stock_ledger):
+    mock_db.fetchone.return_value = None
+    headers = {"Authorization": f"Bearer {create_jwt('terminal@example.com', 'user')}"}
+    client = app.test_client()
+    response = client.post('/api/add/stock_movements', headers=headers, json={
+        "item_code": 999,
+        "movement_type": "receipt",
+        "quantity": 5
+    })
+
+    assert response.status_code == 404
+    assert b"Item not found" in response.data
+
+def test_stock_movement_updates_summary(mock_db, stock_ledger, mocker):
+    summary = mocker.patch('API.inventory_summary', InventorySummary())
+    cursor = mocker.MagicMock()
+    cursor.fetchall.side_effect = [[(1, "Ball", "Balls", 6, 5)], [], []]
+    summary.load(cursor)
+    mock_db.fetchone.return_value = (1,)
+
+    headers = {"Authorization": f"Bearer {create_jwt('terminal@example.com', 'user')}"}
+    client = app.test_client()
+    response = client.post('/api/add/stock_movements', headers=headers, json={
+        "item_code": 1,
+        "movement_type": "issue",
+        "quantity": 2
+    })
+
+    assert response.status_code == 201
+    assert summary.snapshot()["stock_by_item_type"] == {"Balls": 4}
+    assert summary.snapshot()["items_below_reorder_level"] == 1
+
+def test_update_inventory_quantity_records_adjustment(mock_db, stock_ledger):
+    # Inventory row, then the ledger level: no snapshot, opening balance 10, movements +5
+    mock_db.fetchone.side_effect = [(1, "Ball", "Balls", 10, 5), None, (10,), (5,)]
+    headers = {"Authorization": f"Bearer {create_jwt('manager@example.com', 'admin')}"}
+    client = app.test_client()
+
+    response = client.put('/api/update/inventory/1', headers=headers, json={"quantity_in_stock": 12})
+
+    assert response.status_code == 200
+    statements = [call[0] for call in mock_db.execute.call_args_list]
+    assert "FOR UPDATE" in statements[0][0]
+    update = next(statement for statement in statements if "UPDATE Inventory" in statement[0])
+    assert "quantity_in_stock" not in update[0]
+    # The adjustment is part of the same transaction, committed once after the UPDATE
+    assert statements[-1][1] == (1, "adjustment", -3, "Set by inventory update", "manager@example.com")
+    assert mysql.connection.commit.call_count == 1
+
+def test_delete_inventory_purges_stock_ledger(mock_db, stock_ledger):
+    mock_db.rowcount = 1
+    stock_ledger.put(1, 40, stock_ledger.version(1))
+    headers = {"Authorization": f"Bearer {create_jwt('manager@example.com', 'admin')}"}
+    client = app.test_client()
+
+    response = client.delete('/api/delete/inventory/1', headers=headers)
+
+    assert response.status_code == 200
+    statements = [call[0][0] for call in mock_db.execute.call_args_list]
+    assert "DELETE FROM stock_movements WHERE item_code = %s" in statements
+    assert "DELETE FROM stock_snapshots WHERE item_code = %s" in statements
+    assert mysql.connection.commit.call_count == 1
+    assert stock_ledger.get(1) is None
+
 
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,634 @@
+from quart import Quart, jsonify, request, render_template_string
+from http import HTTPStatus
+import jwt
+from datetime import datetime, timedelta
+from functools import wraps
+from contextlib import asynccontextmanager
+from werkzeug.security import generate_password_hash, check_password_hash
+import asyncio
+import json
+import aiomysql
+import os
+
+# Async variant of API.py: the inventory, supplier and activity routes, served by Quart
+# with an aiomysql connection pool so a waiting query does not hold a worker.
+# Run with: hypercorn ASYNC_API:app
+app = Quart(__name__)
+app.config['MYSQL_HOST'] = os.environ.get('MYSQL_HOST', 'localhost')
+app.config['MYSQL_PORT'] = int(os.environ.get('MYSQL_PORT', 3306))
+app.config['MYSQL_USER'] = os.environ.get('MYSQL_USER', 'root')
+app.config['MYSQL_PASSWORD'] = os.environ.get('MYSQL_PASSWORD', 'root')
+app.config['MYSQL_DB'] = os.environ.get('MYSQL_DB', 'minimized_inventory_control_for_sports_centers')
+app.config['MYSQL_POOL_SIZE'] = int(os.environ.get('MYSQL_POOL_SIZE', 20))
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'darwin')
+
+USER_DATA_FILE = os.environ.get('USER_DATA_FILE', 'users.json')
+
+# Connection pool, created on first use
+db_pool = None
+db_pool_lock = asyncio.Lock()
+
+async def get_pool():
+    global db_pool
+    if db_pool is None:
+        async with db_pool_lock:
+            if db_pool is None:
+                db_pool = await aiomysql.create_pool(
+                    host=app.config['MYSQL_HOST'],
+                    port=app.config['MYSQL_PORT'],
+                    user=app.config['MYSQL_USER'],
+                    password=app.config['MYSQL_PASSWORD'],
+                    db=app.config['MYSQL_DB'],
+                    maxsize=app.config['MYSQL_POOL_SIZE'],
+                    autocommit=True,
+                )
+    return db_pool
+
+# Handlers read the request body before entering db_cursor(), so a slow upload never
+# holds one of the MYSQL_POOL_SIZE connections
+@asynccontextmanager
+async def db_cursor():
+    pool = await get_pool()
+    async with pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            yield cursor
+
+# The pool is autocommit, so statements that must succeed or fail together use an
+# explicit transaction
+@asynccontextmanager
+async def db_transaction():
+    async with db_cursor() as cursor:
+        await cursor.execute("START TRANSACTION")
+        try:
+            yield cursor
+        except BaseException:
+            await cursor.execute("ROLLBACK")
+            raise
+        await cursor.execute("COMMIT")
+
+@app.after_serving
+async def close_pool():
+    global db_pool
+    if db_pool is not None:
+        db_pool.close()
+        await db_pool.wait_closed()
+        db_pool = None
+
+# Error handling
+def handle_error(message, status_code):
+    return jsonify({"success": False, "error": message}), status_code
+
+@app.route("/", methods=["GET"])
+async def welcome():
+    return await render_template_string("""
+        <h1>Welcome to the Inventory Control for Sports Centers API!</h1>
+        <a href="/api/register">Register</a><br>
+        <a href="/api/login">Login</a><br>
+        <a href="/api/activities">Activity</a><br>
+    """), HTTPStatus.OK
+
+# JWT ROLES
+def create_jwt(user_id, role):
+    payload = {
+        'user_id': user_id,
+        'role': role,
+        'exp': datetime.utcnow() + timedelta(hours=1),
+        'iat': datetime.utcnow()
+    }
+    return jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
+
+def verify_jwt(token):
+    try:
+        payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+        return payload
+    except jwt.ExpiredSignatureError:
+        return None
+    except jwt.InvalidTokenError:
+        return None
+
+# Security: token verification runs in a worker thread to keep the event loop free
+def token_required(roles=None):
+    def decorator(f):
+        @wraps(f)
+        async def decorated_function(*args, **kwargs):
+            token = request.headers.get('Authorization')
+            if not token:
+                return handle_error('Token is missing', HTTPStatus.UNAUTHORIZED)
+
+            token = token.split(" ")[1] if " " in token else token
+            payload = await asyncio.to_thread(verify_jwt, token)
+            if not payload:
+                return handle_error('Token is invalid or expired', HTTPStatus.UNAUTHORIZED)
+
+            if roles and payload['role'] not in roles:
+                return handle_error('You do not have permission to access this resource', HTTPStatus.FORBIDDEN)
+
+            request.user = payload
+            return await f(*args, **kwargs)
+
+        return decorated_function
+
+    return decorator
+
+def load_users():
+    if not os.path.exists(USER_DATA_FILE):
+        return {}
+    with open(USER_DATA_FILE, 'r') as f:
+        return json.load(f)
+
+def save_users(users):
+    with open(USER_DATA_FILE, 'w') as f:
+        json.dump(users, f)
+
+# Authentication Register and Login
+@app.route("/api/register", methods=["POST"])
+async def register():
+    try:
+        data = await request.get_json()
+        email = data.get("email")
+        password = data.get("password")
+        role = data.get("role")
+
+        if not email or not password or not role:
+            return handle_error("Email, password, and role are required", HTTPStatus.BAD_REQUEST)
+
+        users = await asyncio.to_thread(load_users)
+        if email in users:
+            return handle_error("User already exists", HTTPStatus.BAD_REQUEST)
+
+        hashed_password = await asyncio.to_thread(generate_password_hash, password)
+        users[email] = {
+            "password": hashed_password,
+            "role": role
+        }
+        await asyncio.to_thread(save_users, users)
+
+        return jsonify({"success": True, "message": "User registered successfully"}), HTTPStatus.CREATED
+    except Exception as e:
+        return handle_error(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+@app.route("/api/login", methods=["POST"])
+async def login():
+    try:
+        data = await request.get_json()
+        email = data.get("email")
+        password = data.get("password")
+
+        if not email or not password:
+            return handle_error("Email and password are required", HTTPStatus.BAD_REQUEST)
+
+        users = await asyncio.to_thread(load_users)
+        user = users.get(email)
+
+        if user and await asyncio.to_thread(check_password_hash, user["password"], password):
+            token = create_jwt(email, user["role"])
+            return jsonify({"success": True, "token": token}), HTTPStatus.OK
+
+        return handle_error("Invalid email or password", HTTPStatus.UNAUTHORIZED)
+    except Exception as e:
+        return handle_error(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+# Stock ledger kept by API.py. Current stock is the latest snapshot, or the opening
+# Inventory.quantity_in_stock, plus the movements after it.
+STOCK_LEVELS_QUERY = """
+    SELECT i.item_code, i.item_description, i.item_type_name,
+           CAST(COALESCE(s.quantity, i.quantity_in_stock) + COALESCE((
+               SELECT SUM(m.quantity) FROM stock_movements m
+               WHERE m.item_code = i.item_code AND m.movement_id > COALESCE(s.movement_id, 0)
+           ), 0) AS SIGNED) AS quantity_in_stock,
+           i.reorder_level
+    FROM Inventory i
+    LEFT JOIN stock_snapshots s ON s.item_code = i.item_code AND s.movement_id = (
+        SELECT MAX(movement_id) FROM stock_snapshots WHERE item_code = i.item_code
+    )
+"""
+
+# Same tables as API.ensure_stock_tables(), so either variant can start on an empty database
+stock_tables_ready = False
+
+async def ensure_stock_tables(cursor):
+    global stock_tables_ready
+    if stock_tables_ready:
+        return
+    await cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            movement_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            item_code INT NOT NULL,
+            movement_type VARCHAR(20) NOT NULL,
+            quantity INT NOT NULL,
+            note VARCHAR(255),
+            created_by VARCHAR(255),
+            created_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            INDEX idx_stock_movements_item (item_code, movement_id),
+            INDEX idx_stock_movements_time (item_code, created_at)
+        )
+    """)
+    await cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_snapshots (
+            item_code INT NOT NULL,
+            movement_id BIGINT NOT NULL,
+            quantity INT NOT NULL,
+            taken_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            PRIMARY KEY (item_code, movement_id)
+        )
+    """)
+    stock_tables_ready = True
+
+#GET METHODS
+@app.route("/api/inventory", methods=["GET"])
+@token_required(roles=["admin"])
+async def get_inventory():
+    try:
+        async with db_cursor() as cursor:
+            await ensure_stock_tables(cursor)
+            await cursor.execute(STOCK_LEVELS_QUERY)
+            inventory_items = await cursor.fetchall()
+
+        if not inventory_items:
+            return handle_error("No inventory items found", 404)
+
+        inventory_list = [
+            {
+                "item_code": item[0],
+                "item_description": item[1],
+                "item_type_name": item[2],
+                "quantity_in_stock": item[3],
+                "reorder_level": item[4],
+            }
+            for item in inventory_items
+        ]
+
+        return jsonify({"success": True, "data": inventory_list, "total": len(inventory_list)}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/suppliers", methods=["GET"])
+@token_required(roles=["admin" , "user"])
+async def get_suppliers():
+    try:
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT * FROM Suppliers")
+            suppliers = await cursor.fetchall()
+
+        if not suppliers:
+            return handle_error("No suppliers found", 404)
+
+        suppliers_list = [
+            {
+                "supplier_code": supplier[0],
+                "supplier_name": supplier[1],
+                "supplier_phone": supplier[2],
+            }
+            for supplier in suppliers
+        ]
+
+        return jsonify({"success": True, "data": suppliers_list, "total": len(suppliers_list)}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/activities", methods=["GET"])
+async def get_activities():
+    try:
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT * FROM Activities")
+            activities = await cursor.fetchall()
+
+        if not activities:
+            return handle_error("No activities found", 404)
+
+        activities_list = [
+            {
+                "activity_code": activity[0],
+                "activity_description": activity[1],
+                "item_code": activity[2],
+                "average_monthly_usage": activity[3],
+            }
+            for activity in activities
+        ]
+
+        return jsonify({"success": True, "data": activities_list, "total": len(activities_list)}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/inventory_suppliers", methods=["GET"])
+@token_required(roles=["admin"])
+async def get_inventory_suppliers():
+    try:
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT * FROM inventory_suppliers")
+            inventory_suppliers = await cursor.fetchall()
+
+        if not inventory_suppliers:
+            return handle_error("No activities found", 404)
+
+        inventory_suppliers_list = [
+            {
+                "item_code": inventory_supplier[0],
+                "supplier_code": inventory_supplier[1],
+            }
+            for inventory_supplier in inventory_suppliers
+        ]
+
+        return jsonify({"success": True, "data": inventory_suppliers_list, "total": len(inventory_suppliers_list)}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+#POST METHODS
+@app.route("/api/add/inventory", methods=["POST"])
+@token_required(roles=["admin"])
+async def create_inventory():
+    try:
+        data = await request.get_json()
+        required_fields = ["item_code", "item_description", "item_type_name", "quantity_in_stock", "reorder_level"]
+
+        for field in required_fields:
+            if field not in data:
+                return handle_error(f"Missing required field: {field}", 400)
+
+        async with db_cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO Inventory (item_code, item_description, item_type_name, quantity_in_stock, reorder_level)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (data["item_code"], data["item_description"], data["item_type_name"], data["quantity_in_stock"], data["reorder_level"]))
+
+        return jsonify({"success": True, "message": "Inventory item created successfully"}), 201
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/add/suppliers", methods=["POST"])
+@token_required(roles=["admin", "user"])
+async def create_supplier():
+    try:
+        data = await request.get_json()
+        required_fields = ["supplier_code", "supplier_name", "supplier_phone"]
+
+        for field in required_fields:
+            if field not in data:
+                return handle_error(f"Missing required field: {field}", 400)
+
+        async with db_cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO Suppliers (supplier_code, supplier_name, supplier_phone)
+                VALUES (%s, %s, %s)
+            """, (data["supplier_code"], data["supplier_name"], data["supplier_phone"]))
+
+        return jsonify({"success": True, "message": "Supplier created successfully"}), 201
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/add/activities", methods=["POST"])
+@token_required(roles=["admin"])
+async def create_activity():
+    try:
+        data = await request.get_json()
+        required_fields = ["activity_code", "activity_description", "item_code", "average_monthly_usage"]
+
+        for field in required_fields:
+            if field not in data:
+                return handle_error(f"Missing required field: {field}", 400)
+
+        async with db_cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO Activities (activity_code, activity_description, item_code, average_monthly_usage)
+                VALUES (%s, %s, %s, %s)
+            """, (data["activity_code"], data["activity_description"], data["item_code"], data["average_monthly_usage"]))
+
+        return jsonify({"success": True, "message": "Activity created successfully"}), 201
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/add/inventory_suppliers", methods=["POST"])
+@token_required(roles=["admin"])
+async def create_inventory_supplier():
+    try:
+        data = await request.get_json()
+        required_fields = ["item_code", "supplier_code"]
+
+        for field in required_fields:
+            if field not in data:
+                return handle_error(f"Missing required field: {field}", 400)
+
+        async with db_cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO inventory_suppliers (item_code, supplier_code)
+                VALUES (%s, %s)
+            """, (data["item_code"], data["supplier_code"]))
+
+        return jsonify({"success": True, "message": "Inventory supplier created successfully"}), 201
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+# DELETE METHODS
+@app.route("/api/delete/inventory/<item_code>", methods=["DELETE"])
+@token_required(roles=["admin"])
+async def delete_inventory_item(item_code):
+    try:
+        async with db_transaction() as cursor:
+            await ensure_stock_tables(cursor)
+            await cursor.execute("DELETE FROM Inventory WHERE item_code = %s", (item_code,))
+            deleted = cursor.rowcount
+            # The ledger goes with the item, as in API.py
+            if deleted:
+                await cursor.execute("DELETE FROM stock_movements WHERE item_code = %s", (item_code,))
+                await cursor.execute("DELETE FROM stock_snapshots WHERE item_code = %s", (item_code,))
+
+        if deleted == 0:
+            return handle_error("Item not found", HTTPStatus.NOT_FOUND)
+
+        return jsonify({"success": True, "message": "Item deleted successfully"}), HTTPStatus.OK
+    except Exception as e:
+        return handle_error(f"An error occurred: {str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+@app.route("/api/delete/suppliers/<supplier_code>", methods=["DELETE"])
+@token_required(roles=["admin"])
+async def delete_suppliers_item(supplier_code):
+    try:
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT * FROM suppliers WHERE supplier_code = %s", (supplier_code,))
+            item = await cursor.fetchone()
+
+            if not item:
+                return handle_error("Item not found", 404)
+
+            await cursor.execute("DELETE FROM suppliers WHERE supplier_code = %s", (supplier_code,))
+
+        return jsonify({"success": True, "message": f"Item with code {supplier_code} deleted successfully"}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/delete/activities/<activity_code>", methods=["DELETE"])
+@token_required(roles=["admin"])
+async def delete_activities_item(activity_code):
+    try:
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT * FROM activities WHERE activity_code = %s", (activity_code,))
+            item = await cursor.fetchone()
+
+            if not item:
+                return handle_error("Item not found", 404)
+
+            await cursor.execute("DELETE FROM activities WHERE activity_code = %s", (activity_code,))
+
+        return jsonify({"success": True, "message": f"Item with code {activity_code} deleted successfully"}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/delete/inventory_suppliers/<item_code>", methods=["DELETE"])
+@token_required(roles=["admin"])
+async def delete_inventory_suppliers_item(item_code):
+    try:
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT * FROM inventory_suppliers WHERE item_code = %s", (item_code,))
+            item = await cursor.fetchone()
+
+            if not item:
+                return handle_error("Item not found", 404)
+
+            await cursor.execute("DELETE FROM inventory_suppliers WHERE item_code = %s", (item_code,))
+
+        return jsonify({"success": True, "message": f"Item with code {item_code} deleted successfully"}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+#UPDATE METHODS
+@app.route("/api/update/inventory/<int:item_code>", methods=["PUT"])
+@token_required(roles=["admin"])
+async def update_inventory_item(item_code):
+    try:
+        data = await request.get_json()
+
+        if not data:
+            return handle_error("No data provided for update", 400)
+
+        # Stock only changes through the stock ledger, which only API.py writes
+        if "quantity_in_stock" in data:
+            return handle_error("quantity_in_stock can only be changed through API.py's stock ledger", 400)
+
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT * FROM Inventory WHERE item_code = %s", (item_code,))
+            item = await cursor.fetchone()
+
+            if not item:
+                return handle_error("Item not found", 404)
+
+            update_query = """
+            UPDATE Inventory
+            SET item_description = %s, item_type_name = %s, reorder_level = %s
+            WHERE item_code = %s
+            """
+            values = (
+                data.get("item_description", item[1]),
+                data.get("item_type_name", item[2]),
+                data.get("reorder_level", item[4]),
+                item_code
+            )
+
+            await cursor.execute(update_query, values)
+
+        return jsonify({"success": True, "message": f"Item with code {item_code} updated successfully"}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/update/suppliers/<int:supplier_code>", methods=["PUT"])
+@token_required(roles=["admin", "user"])
+async def update_suppliers_item(supplier_code):
+    try:
+        data = await request.get_json()
+
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT * FROM Suppliers WHERE supplier_code = %s", (supplier_code,))
+            item = await cursor.fetchone()
+
+            if not item:
+                return handle_error("Item not found", 404)
+
+            if not data:
+                return handle_error("No data provided for update", 400)
+
+            update_query = """
+            UPDATE Suppliers
+            SET supplier_name = %s, supplier_phone = %s
+            WHERE supplier_code = %s
+            """
+            values = (
+                data.get("supplier_name", item[1]),
+                data.get("supplier_phone", item[2]),
+                supplier_code
+            )
+
+            await cursor.execute(update_query, values)
+
+        return jsonify({"success": True, "message": f"Supplier with code {supplier_code} updated successfully"}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/update/activities/<int:activity_code>", methods=["PUT"])
+@token_required(roles=["admin", "user"])
+async def update_activities_item(activity_code):
+    try:
+        data = await request.get_json()
+
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT * FROM Activities WHERE activity_code = %s", (activity_code,))
+            item = await cursor.fetchone()
+
+            if not item:
+                return handle_error("Item not found", 404)
+
+            if not data:
+                return handle_error("No data provided for update", 400)
+
+            update_query = """
+            UPDATE Activities
+            SET activity_description = %s, item_code = %s, average_monthly_usage = %s
+            WHERE activity_code = %s
+            """
+            values = (
+                data.get("activity_description", item[1]),
+                data.get("item_code", item[2]),
+                data.get("average_monthly_usage", item[3]),
+                activity_code
+            )
+
+            await cursor.execute(update_query, values)
+
+        return jsonify({"success": True, "message": f"Activity with code {activity_code} updated successfully"}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+@app.route("/api/update/inventory_suppliers/<int:item_code>", methods=["PUT"])
+@token_required(roles=["admin"])
+async def update_inventory_suppliers_item(item_code):
+    try:
+        data = await request.get_json()
+
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT * FROM inventory_suppliers WHERE item_code = %s", (item_code,))
+            item = await cursor.fetchone()
+
+            if not item:
+                return handle_error("Item not found", 404)
+
+            if not data:
+                return handle_error("No data provided for update", 400)
+
+            update_query = """
+            UPDATE inventory_suppliers
+            SET supplier_code = %s
+            WHERE item_code = %s
+            """
+            values = (
+                data.get("supplier_code", item[1]),
+                item_code
+            )
+
+            await cursor.execute(update_query, values)
+
+        return jsonify({"success": True, "message": f"Inventory supplier record with item code {item_code} updated successfully"}), 200
+    except Exception as e:
+        return handle_error(str(e), 500)
+
+if __name__ == "__main__":
+    app.run()
@@ -0,0 +1,201 @@
+import asyncio
+import time
+import pytest
+import ASYNC_API
+from ASYNC_API import app, create_jwt
+
+# Local MySQL stand-in: every query waits `latency` seconds like a network round trip
+class FakeCursor:
+    def __init__(self, pool):
+        self.pool = pool
+        self.rowcount = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, params=None):
+        self.pool.in_flight += 1
+        self.pool.peak_in_flight = max(self.pool.peak_in_flight, self.pool.in_flight)
+        await asyncio.sleep(self.pool.latency)
+        self.pool.in_flight -= 1
+        self.pool.queries.append(query)
+        self.rowcount = len(self.pool.rows)
+
+    async def fetchall(self):
+        return self.pool.rows
+
+    async def fetchone(self):
+        return self.pool.rows[0] if self.pool.rows else None
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return FakeCursor(self.pool)
+
+# Like aiomysql, at most `maxsize` connections are handed out; other callers wait
+class FakeAcquire:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        self.pool.waiting += 1
+        self.pool.peak_waiting = max(self.pool.peak_waiting, self.pool.waiting)
+        await self.pool.connections.acquire()
+        self.pool.waiting -= 1
+        return FakeConnection(self.pool)
+
+    async def __aexit__(self, *exc):
+        self.pool.connections.release()
+        return False
+
+class FakePool:
+    def __init__(self, rows=None, latency=0, maxsize=None):
+        self.rows = rows or []
+        self.latency = latency
+        self.maxsize = maxsize or app.config['MYSQL_POOL_SIZE']
+        self.connections = asyncio.Semaphore(self.maxsize)
+        self.queries = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+
+    def acquire(self):
+        return FakeAcquire(self)
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    pool = FakePool()
+
+    async def get_pool():
+        return pool
+    monkeypatch.setattr(ASYNC_API, "get_pool", get_pool)
+    return pool
+
+def auth_headers(role="admin"):
+    return {"Authorization": f"Bearer {create_jwt('tester@example.com', role)}"}
+
+def test_index():
+    async def run():
+        client = app.test_client()
+        response = await client.get('/')
+        assert response.status_code == 200
+        assert b"Welcome to the Inventory Control for Sports Centers API!" in await response.get_data()
+    asyncio.run(run())
+
+def test_get_inventory_empty(fake_pool):
+    async def run():
+        client = app.test_client()
+        response = await client.get('/api/inventory', headers=auth_headers())
+        assert response.status_code == 404
+        assert b"No inventory items found" in await response.get_data()
+    asyncio.run(run())
+
+def test_get_inventory_success(fake_pool):
+    fake_pool.rows = [(1, "Ball", "Sports Equipment", 20, 5)]
+
+    async def run():
+        client = app.test_client()
+        response = await client.get('/api/inventory', headers=auth_headers())
+        assert response.status_code == 200
+        assert await response.get_json() == {
+            "success": True,
+            "data": [{
+                "item_code": 1,
+                "item_description": "Ball",
+                "item_type_name": "Sports Equipment",
+                "quantity_in_stock": 20,
+                "reorder_level": 5,
+            }],
+            "total": 1,
+        }
+    asyncio.run(run())
+
+def test_get_inventory_reads_stock_from_ledger(fake_pool):
+    async def run():
+        client = app.test_client()
+        await client.get('/api/inventory', headers=auth_headers())
+        assert "stock_movements" in fake_pool.queries[-1]
+    asyncio.run(run())
+
+def test_update_inventory_rejects_quantity_in_stock(fake_pool):
+    fake_pool.rows = [(1, "Ball", "Sports Equipment", 20, 5)]
+
+    async def run():
+        client = app.test_client()
+        response = await client.put('/api/update/inventory/1', json={"quantity_in_stock": 60}, headers=auth_headers())
+        assert response.status_code == 400
+        assert fake_pool.queries == []
+
+        response = await client.put('/api/update/inventory/1', json={"reorder_level": 8}, headers=auth_headers())
+        assert response.status_code == 200
+        assert "quantity_in_stock" not in fake_pool.queries[-1]
+    asyncio.run(run())
+
+def test_delete_inventory_purges_stock_ledger(fake_pool):
+    fake_pool.rows = [(1, "Ball", "Sports Equipment", 20, 5)]
+
+    async def run():
+        client = app.test_client()
+        response = await client.delete('/api/delete/inventory/1', headers=auth_headers())
+        assert response.status_code == 200
+        assert fake_pool.queries[-4:] == [
+            "DELETE FROM Inventory WHERE item_code = %s",
+            "DELETE FROM stock_movements WHERE item_code = %s",
+            "DELETE FROM stock_snapshots WHERE item_code = %s",
+            "COMMIT",
+        ]
+    asyncio.run(run())
+
+def test_get_inventory_requires_token(fake_pool):
+    async def run():
+        client = app.test_client()
+        response = await client.get('/api/inventory')
+        assert response.status_code == 401
+        assert b"Token is missing" in await response.get_data()
+    asyncio.run(run())
+
+def test_post_inventory_missing_fields(fake_pool):
+    async def run():
+        client = app.test_client()
+        response = await client.post('/api/add/inventory', json={}, headers=auth_headers())
+        assert response.status_code == 400
+        assert b"Missing required field" in await response.get_data()
+    asyncio.run(run())
+
+def test_delete_activity_not_found(fake_pool):
+    async def run():
+        client = app.test_client()
+        response = await client.delete('/api/delete/activities/999', headers=auth_headers())
+        assert response.status_code == 404
+        assert b"Item not found" in await response.get_data()
+    asyncio.run(run())
+
+def test_thousands_of_concurrent_requests_in_one_process(fake_pool):
+    fake_pool.rows = [(1, "ABC Supplies", "123-456-7890")]
+    fake_pool.latency = 0.01
+    requests = 2000
+    headers = auth_headers("user")
+
+    async def run():
+        client = app.test_client()
+        started = time.monotonic()
+        responses = await asyncio.gather(*[client.get('/api/suppliers', headers=headers) for _ in range(requests)])
+        return responses, time.monotonic() - started
+
+    responses, elapsed = asyncio.run(run())
+
+    assert all(response.status_code == 200 for response in responses)
+    # The queries never exceed MYSQL_POOL_SIZE, while nearly every request is held open
+    # waiting for a connection instead of occupying a worker
+    assert fake_pool.peak_in_flight == app.config['MYSQL_POOL_SIZE']
+    assert fake_pool.peak_waiting > requests - app.config['MYSQL_POOL_SIZE'] * 2
+    # With 20 connections the 2000 queries need at least 1 second, which shows they ran
+    # MYSQL_POOL_SIZE at a time rather than all at once
+    minimum = requests / app.config['MYSQL_POOL_SIZE'] * fake_pool.latency
+    assert elapsed >= minimum
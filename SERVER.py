@@ -0,0 +1,61 @@
+import argparse
+import os
+from gunicorn.app.base import BaseApplication
+
+# Production entry point: a pre-forking gunicorn server running API.create_app().
+# API is only imported inside load() so the command starts quickly.
+class InventoryServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from API import create_app
+        return create_app()
+
+# Warm-up: each worker serves one request before it accepts traffic, so routing
+# and templates are ready before the first real client arrives
+def warm_up(worker):
+    # gthread workers on gunicorn 23 keep every accepted request, running or waiting for a
+    # thread, in worker.futures; admission control sheds load based on that queue
+    if hasattr(worker, "futures"):
+        worker.wsgi.config['QUEUE_DEPTH'] = lambda: len(worker.futures)
+    else:
+        worker.log.warning("%s has no futures queue; MAX_IN_FLIGHT only counts requests running in the app",
+                           type(worker).__name__)
+
+    client = worker.wsgi.test_client()
+    client.get("/")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the Inventory Control API with gunicorn")
+    parser.add_argument("--bind", default=os.environ.get("BIND", "0.0.0.0:8000"))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("WEB_THREADS", 4)))
+    parser.add_argument("--timeout", type=int, default=int(os.environ.get("WEB_TIMEOUT", 30)))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30)))
+    parser.add_argument("--max-requests", type=int, default=int(os.environ.get("WEB_MAX_REQUESTS", 0)))
+    parser.add_argument("--no-preload", action="store_true",
+                        help="Import the app in each worker instead of once in the master")
+    return parser.parse_args()
+
+def build_options(args):
+    return {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread" if args.threads > 1 else "sync",
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10,
+        "preload_app": not args.no_preload,
+        "post_worker_init": warm_up,
+    }
+
+if __name__ == "__main__":
+    InventoryServer(build_options(parse_args())).run()